@@ -1,10 +1,14 @@
 # backend/claude_service.py
 import anthropic
+import asyncio
+import math
+import random
 import time
-import json
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from anthropic import APIError, APIConnectionError, RateLimitError, APIStatusError
 import logging
+from collections import OrderedDict
+from functools import lru_cache
 
 from models import QuizQuestion
 
@@ -12,6 +16,110 @@ from models import QuizQuestion
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Static quiz instructions, sent as a cacheable system prompt so the same
+# prefix is reused across requests
+QUIZ_SYSTEM_PROMPT = """You are an algebra tutor writing practice quizzes for high school students.
+
+Requirements:
+1. Questions should be at an appropriate difficulty level
+2. Include 4 options (A, B, C, D) per question
+3. Provide detailed explanations for correct answers
+4. Reference relevant math concepts in explanations
+
+Submit the questions by calling the submit_quiz tool."""
+
+# Tool schema matching QuizQuestion, so Claude returns structured input
+# instead of free-form JSON text
+_QUESTION_OPTION = {"type": "string"}
+
+QUIZ_TOOL = {
+    "name": "submit_quiz",
+    "description": "Submit the generated multiple-choice practice quiz.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "questions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "question": {"type": "string"},
+                        "options": {
+                            "type": "object",
+                            "properties": {
+                                "A": _QUESTION_OPTION,
+                                "B": _QUESTION_OPTION,
+                                "C": _QUESTION_OPTION,
+                                "D": _QUESTION_OPTION
+                            },
+                            "required": ["A", "B", "C", "D"]
+                        },
+                        "correct": {"type": "string", "enum": ["A", "B", "C", "D"]},
+                        "explanation": {"type": "string"},
+                        "topic": {"type": "string"}
+                    },
+                    "required": ["question", "options", "correct", "explanation", "topic"]
+                }
+            }
+        },
+        "required": ["questions"]
+    }
+}
+
+# Request parameters that never change between calls, built once so every
+# request sends an identical (cacheable) prefix. Note: the API only caches a
+# prefix of at least 1024 tokens (Sonnet models); the system prompt plus tool
+# schema is a few hundred tokens, so this breakpoint caches nothing until the
+# static instructions grow past that minimum.
+QUIZ_SYSTEM_BLOCKS = [
+    {
+        "type": "text",
+        "text": QUIZ_SYSTEM_PROMPT,
+        "cache_control": {"type": "ephemeral"}
+    }
+]
+QUIZ_TOOLS = [QUIZ_TOOL]
+QUIZ_TOOL_CHOICE = {"type": "tool", "name": QUIZ_TOOL["name"]}
+
+# Per-request details; the static instructions live in the system prompt
+QUIZ_USER_PROMPT = """Generate {num_questions} multiple-choice algebra {question_noun} about {topic_display} for a high school student.
+Use "{topic}" as the topic value for every question.
+
+Student context:
+- Current grade average: {grade_average}
+- Struggling with: {struggling_topics}{focus}"""
+
+# Appended to each shard's prompt so concurrent requests for one quiz cover
+# different ground instead of repeating each other
+QUIZ_SHARD_FOCUS = """
+
+This request is part {part} of {parts} of one {total}-question quiz (questions {first}-{last}).
+Split the topic into {parts} distinct sub-skills, ordered from most basic to most advanced, and write questions only for sub-skill {part}."""
+
+# Appended to a follow-up request that replaces duplicate questions
+QUIZ_AVOID_FOCUS = """
+
+Do not repeat or reword any of these questions:
+{questions}"""
+
+# Longest a quiz request waits (in seconds) before calling the API; anything
+# longer fails fast so the caller can serve a fallback quiz instead
+MAX_RETRY_DELAY = 60.0
+
+# Async clients shared across ClaudeService instances, keyed by API key, so
+# re-initializing the service (e.g. on reload) reuses the warm connection pool
+_clients: Dict[str, anthropic.AsyncAnthropic] = {}
+
+
+def _get_client(api_key: str) -> anthropic.AsyncAnthropic:
+    """Return the shared async client for api_key, creating it on first use"""
+    client = _clients.get(api_key)
+    if client is None:
+        # Retries are handled by ClaudeService, so disable the library's own
+        client = anthropic.AsyncAnthropic(api_key=api_key, max_retries=0)
+        _clients[api_key] = client
+    return client
+
 
 class ClaudeAPIError(Exception):
     """Custom exception for Claude API errors with user-friendly messages"""
@@ -22,10 +130,145 @@ class ClaudeAPIError(Exception):
         super().__init__(self.message)
 
 
+class TokenBucket:
+    """Async token bucket that keeps requests under the API rate limit locally"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, max_wait: float = MAX_RETRY_DELAY):
+        """
+        Initialize a full bucket
+
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum burst size, defaults to one second of tokens
+            max_wait: Longest acquire() may wait before raising ClaudeAPIError
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.max_wait = max_wait
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        # No tokens accrue while the bucket is drained
+        start = max(self._last_refill, self._blocked_until)
+        if now > start:
+            self._tokens = min(self.capacity, self._tokens + (now - start) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        """
+        Wait until cost tokens are available and consume them
+
+        Raises:
+            ClaudeAPIError: If the tokens would not be available within max_wait
+        """
+        # Time spent queued behind other callers counts towards max_wait
+        deadline = time.monotonic() + self.max_wait
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                else:
+                    wait = (cost - self._tokens) / self.rate
+
+                if now + wait > deadline:
+                    raise ClaudeAPIError(
+                        "Service is experiencing high demand. Please try again in a moment.",
+                        retry_after=math.ceil(wait)
+                    )
+
+                await asyncio.sleep(wait)
+
+    def drain_until(self, deadline: float) -> None:
+        """
+        Empty the bucket and hold all requests until deadline (time.monotonic() seconds),
+        at most max_wait from now
+        """
+        self._tokens = 0.0
+        deadline = min(deadline, time.monotonic() + self.max_wait)
+        self._blocked_until = max(self._blocked_until, deadline)
+
+
+class QuizCache:
+    """In-process LRU cache of generated quizzes keyed by topic and student bucket"""
+
+    def __init__(self, max_size: int = 512):
+        """
+        Initialize an empty cache
+
+        Args:
+            max_size: Maximum number of quizzes kept before evicting the least recently used
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple, List[QuizQuestion]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(topic: str, num_questions: int, student_context: Dict[str, Any], model: str) -> Tuple:
+        """Canonicalize a quiz request so similar students share a cache entry"""
+
+        # Bucket the grade average to the nearest 10%, rounding halves up
+        # (round() would send 65 down to 60 but 75 up to 80)
+        grade_bucket = None
+        grade_average = str(student_context.get('grade_average', '')).rstrip('%')
+        try:
+            grade_bucket = math.floor(float(grade_average) / 10 + 0.5) * 10
+        except ValueError:
+            pass
+
+        struggling = student_context.get('struggling_topics') or []
+        if isinstance(struggling, str):
+            struggling = [t.strip() for t in struggling.split(',')]
+        struggling_key = tuple(sorted(t for t in struggling if t and t not in ('None', 'N/A')))
+
+        return (topic, num_questions, grade_bucket, struggling_key, model)
+
+    def get(self, key: Tuple) -> Optional[List[QuizQuestion]]:
+        """Return a copy of the cached quiz for key, or None on a miss"""
+        questions = self._entries.get(key)
+        if questions is None:
+            return None
+
+        self._entries.move_to_end(key)
+        return [q.model_copy(deep=True) for q in questions]
+
+    def put(self, key: Tuple, questions: List[QuizQuestion]) -> None:
+        """Store a copy of questions under key, evicting the oldest entries if full"""
+        self._entries[key] = [q.model_copy(deep=True) for q in questions]
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached quizzes"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class ClaudeService:
     """Service for interacting with Claude API with robust error handling"""
 
-    def __init__(self, api_key: str, max_retries: int = 3, initial_retry_delay: float = 1.0):
+    def __init__(
+        self,
+        api_key: str,
+        max_retries: int = 3,
+        initial_retry_delay: float = 1.0,
+        cache_size: int = 512,
+        max_parallel_requests: int = 4,
+        requests_per_second: Optional[float] = None,
+        rng: Optional[random.Random] = None
+    ):
         """
         Initialize Claude service with retry configuration
 
@@ -33,23 +276,46 @@ class ClaudeService:
             api_key: Anthropic API key
             max_retries: Maximum number of retry attempts
             initial_retry_delay: Initial delay in seconds before first retry
+            cache_size: Maximum number of generated quizzes kept in the response cache
+            max_parallel_requests: Maximum number of concurrent Claude API calls
+            requests_per_second: Local rate limit for Claude API calls (None for no limit)
+            rng: Random number generator for backoff jitter (injectable for tests)
         """
         if not api_key:
             raise ClaudeAPIError("Claude API key is not configured. Please set ANTHROPIC_API_KEY in your environment.")
 
-        self.client = anthropic.Anthropic(api_key=api_key)
+        # Async client so API calls don't block the event loop
+        self.client = _get_client(api_key)
         self.max_retries = max_retries
         self.initial_retry_delay = initial_retry_delay
+        self._rng = rng or random.Random()
+        self.cache = QuizCache(max_size=cache_size)
+        self.max_parallel_requests = max_parallel_requests
+        # Shared by all in-flight requests to bound concurrent API calls
+        self._request_slots = asyncio.Semaphore(max_parallel_requests)
+        # Local rate limiter so bursts wait here instead of earning a 429
+        self._bucket = TokenBucket(rate=requests_per_second) if requests_per_second else None
 
         logger.info("✅ Claude service initialized")
 
     def _calculate_backoff_delay(self, attempt: int) -> float:
-        """Calculate exponential backoff delay with jitter"""
-        import random
-        base_delay = self.initial_retry_delay * (2 ** attempt)
-        # Add jitter to prevent thundering herd
-        jitter = random.uniform(0, 0.1 * base_delay)
-        return min(base_delay + jitter, 60.0)  # Cap at 60 seconds
+        """Calculate exponential backoff delay with full jitter"""
+        # Pick uniformly below the capped exponential delay so retries from
+        # many clients spread out instead of arriving together
+        return self._rng.uniform(0, min(self.initial_retry_delay * (2 ** attempt), MAX_RETRY_DELAY))
+
+    def _get_retry_after(self, error: Exception) -> Optional[float]:
+        """Read the Retry-After header (in seconds) from an API error, if present"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if headers is None:
+            return None
+
+        try:
+            retry_after = float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+        return retry_after if retry_after >= 0 else None
 
     def _get_user_friendly_error(self, error: Exception) -> str:
         """Convert technical errors to user-friendly messages"""
@@ -78,7 +344,7 @@ class ClaudeService:
             else:
                 return f"The AI service returned an error (code {status_code}). Please try again."
 
-        elif isinstance(error, json.JSONDecodeError):
+        elif isinstance(error, (KeyError, TypeError, ValueError)):
             return "Received an invalid response from the AI service. Please try again."
 
         elif isinstance(error, anthropic.APIError):
@@ -122,6 +388,10 @@ class ClaudeService:
         """
         Generate quiz questions using Claude API with retry logic
 
+        Quizzes of 4 or more questions are split across up to
+        max_parallel_requests concurrent API calls of at least 2 questions
+        each, one sub-skill per call, and merged.
+
         Args:
             topic: Quiz topic
             num_questions: Number of questions to generate
@@ -135,73 +405,142 @@ class ClaudeService:
             ClaudeAPIError: If generation fails after all retries
         """
 
-        topic_display = topic.replace("_", " ").title()
+        cache_key = QuizCache.make_key(topic, num_questions, student_context, model)
+        cached_questions = self.cache.get(cache_key)
+        if cached_questions is not None:
+            logger.info("⚡ Returning cached quiz")
+            return cached_questions
+
+        # Output generation dominates latency, so larger quizzes are split
+        # into shards generated concurrently, each with at least 2 questions
+        num_shards = max(1, min(self.max_parallel_requests, num_questions // 2))
+        shards = [
+            num_questions // num_shards + (1 if i < num_questions % num_shards else 0)
+            for i in range(num_shards)
+        ]
+
+        focuses = [""]
+        if num_shards > 1:
+            logger.info(f"🔀 Generating {num_questions} questions in {num_shards} parallel requests")
+            # Give each shard its own sub-skill so they don't write the same questions
+            starts = [sum(shards[:i]) for i in range(num_shards)]
+            focuses = [
+                QUIZ_SHARD_FOCUS.format(
+                    part=i + 1, parts=num_shards, total=num_questions,
+                    first=start + 1, last=start + n
+                )
+                for i, (start, n) in enumerate(zip(starts, shards))
+            ]
 
-        # Create prompt for Claude
-        prompt = f"""Generate {num_questions} multiple-choice algebra questions about {topic_display} for a high school student.
+        results = await asyncio.gather(
+            *[
+                self._request_questions(topic, n, student_context, model, focus)
+                for n, focus in zip(shards, focuses)
+            ],
+            return_exceptions=True
+        )
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            if isinstance(errors[0], ClaudeAPIError):
+                raise errors[0]
+            raise ClaudeAPIError(self._get_user_friendly_error(errors[0]), original_error=errors[0])
+
+        # Merge shards, dropping questions that came back more than once
+        questions = []
+        seen = set()
+
+        def merge(batch: List[QuizQuestion]) -> None:
+            for question in batch:
+                if len(questions) < num_questions and question.question not in seen:
+                    seen.add(question.question)
+                    questions.append(question)
+
+        for shard_questions in results:
+            merge(shard_questions)
+
+        # Ask once more for questions lost to duplicates or a short response
+        missing = num_questions - len(questions)
+        if missing > 0:
+            logger.info(f"🔁 Requesting {missing} more questions to fill the quiz")
+            try:
+                avoid = QUIZ_AVOID_FOCUS.format(questions="\n".join(f"- {q.question}" for q in questions))
+                merge(await self._request_questions(topic, missing, student_context, model, avoid))
+            except ClaudeAPIError as e:
+                logger.warning(f"⚠️ Could not fill the quiz: {e.message}")
+
+        # Never cache a short quiz, so the next request gets a full one
+        if len(questions) < num_questions:
+            logger.warning(f"⚠️ Returning {len(questions)} of {num_questions} questions (not cached)")
+        else:
+            self.cache.put(cache_key, questions)
+        return questions
 
-Student context:
-- Current grade average: {student_context.get('grade_average', 'N/A')}
-- Struggling with: {student_context.get('struggling_topics', 'N/A')}
+    async def _request_questions(
+        self,
+        topic: str,
+        num_questions: int,
+        student_context: Dict[str, Any],
+        model: str,
+        focus: str = ""
+    ) -> List[QuizQuestion]:
+        """
+        Request a single batch of questions from Claude, retrying transient errors
 
-Requirements:
-1. Questions should be at an appropriate difficulty level
-2. Include 4 options (A, B, C, D) per question
-3. Provide detailed explanations for correct answers
-4. Reference relevant math concepts in explanations
+        Args:
+            focus: Extra instructions appended to the prompt (e.g. this shard's sub-skill)
 
-Output ONLY valid JSON in this exact format (no markdown, no extra text):
-[
-  {{
-    "question": "Solve for x: 2x + 5 = 13",
-    "options": {{
-      "A": "x = 3",
-      "B": "x = 4",
-      "C": "x = 5",
-      "D": "x = 6"
-    }},
-    "correct": "B",
-    "explanation": "Subtract 5 from both sides: 2x = 8. Then divide by 2: x = 4. This uses the principle of inverse operations.",
-    "topic": "{topic}"
-  }}
-]"""
+        Raises:
+            ClaudeAPIError: If the request fails after all retries
+        """
+
+        topic_display = topic.replace("_", " ").title()
+
+        prompt = QUIZ_USER_PROMPT.format(
+            num_questions=num_questions,
+            question_noun="question" if num_questions == 1 else "questions",
+            topic_display=topic_display,
+            topic=topic,
+            grade_average=student_context.get('grade_average', 'N/A'),
+            struggling_topics=student_context.get('struggling_topics', 'N/A'),
+            focus=focus
+        )
 
         last_error = None
+        next_delay = None
 
         for attempt in range(self.max_retries + 1):
             try:
                 if attempt > 0:
-                    delay = self._calculate_backoff_delay(attempt - 1)
+                    delay = next_delay if next_delay is not None else self._calculate_backoff_delay(attempt - 1)
+                    next_delay = None
                     logger.info(f"🔄 Retry attempt {attempt}/{self.max_retries} after {delay:.1f}s delay")
-                    time.sleep(delay)
-
-                logger.info(f"📞 Calling Claude API (attempt {attempt + 1}/{self.max_retries + 1})...")
-
-                # Call Claude API
-                message = self.client.messages.create(
-                    model=model,
-                    max_tokens=2000,
-                    messages=[{"role": "user", "content": prompt}]
-                )
+                    await asyncio.sleep(delay)
+
+                if self._bucket:
+                    await self._bucket.acquire()
+
+                # Call Claude API, forcing the quiz tool so the questions arrive structured
+                async with self._request_slots:
+                    logger.info(f"📞 Calling Claude API (attempt {attempt + 1}/{self.max_retries + 1})...")
+                    message = await self.client.messages.create(
+                        model=model,
+                        max_tokens=2000,
+                        system=QUIZ_SYSTEM_BLOCKS,
+                        tools=QUIZ_TOOLS,
+                        tool_choice=QUIZ_TOOL_CHOICE,
+                        messages=[{"role": "user", "content": prompt}]
+                    )
 
                 logger.info("✅ Claude API responded successfully!")
 
-                # Parse response
-                response_text = message.content[0].text.strip()
-
-                # Remove markdown code blocks if present
-                if response_text.startswith("```"):
-                    response_text = response_text.split("```")[1]
-                    if response_text.startswith("json"):
-                        response_text = response_text[4:]
-                response_text = response_text.strip()
-
-                # Parse JSON
-                questions_data = json.loads(response_text)
-                logger.info(f"✅ Successfully parsed {len(questions_data)} questions")
+                tool_use = next((block for block in message.content if block.type == "tool_use"), None)
+                if tool_use is None:
+                    raise ValueError("Response did not include a submit_quiz tool call")
 
                 # Convert to QuizQuestion models
-                questions = [QuizQuestion(**q) for q in questions_data]
+                questions = [QuizQuestion(**q) for q in tool_use.input["questions"]]
+                logger.info(f"✅ Received {len(questions)} questions")
 
                 return questions
 
@@ -209,26 +548,41 @@ Output ONLY valid JSON in this exact format (no markdown, no extra text):
                 last_error = e
                 logger.warning(f"⚠️ API error on attempt {attempt + 1}: {type(e).__name__}: {str(e)}")
 
-                if not self._should_retry(e, attempt):
+                retry_after = self._get_retry_after(e)
+
+                # Hold all local requests until the server's rate limit window resets
+                if self._bucket and retry_after and (isinstance(e, RateLimitError) or getattr(e, 'status_code', None) == 429):
+                    self._bucket.drain_until(time.monotonic() + retry_after)
+
+                # Don't hold the request open longer than MAX_RETRY_DELAY; the
+                # caller serves a fallback quiz instead
+                too_long = retry_after is not None and retry_after > MAX_RETRY_DELAY
+
+                if too_long or not self._should_retry(e, attempt):
                     # Get user-friendly error message
                     user_message = self._get_user_friendly_error(e)
 
-                    # Extract retry_after if available (for rate limits)
-                    retry_after = None
-                    if isinstance(e, RateLimitError):
-                        retry_after = getattr(e, 'retry_after', None)
+                    raise ClaudeAPIError(
+                        user_message,
+                        original_error=e,
+                        retry_after=math.ceil(retry_after) if retry_after is not None else None
+                    )
 
-                    raise ClaudeAPIError(user_message, original_error=e, retry_after=retry_after)
+                # Wait as long as the server asked, falling back to backoff if it didn't say
+                next_delay = retry_after
 
                 # Continue to next retry attempt
                 continue
 
-            except json.JSONDecodeError as e:
+            except ClaudeAPIError:
+                # Already user-facing (e.g. the rate limiter gave up waiting)
+                raise
+
+            except (KeyError, TypeError, ValueError) as e:
                 last_error = e
-                logger.error(f"❌ JSON parsing error: {str(e)}")
-                logger.error(f"   Response text: {response_text[:200]}...")
+                logger.error(f"❌ Invalid quiz response: {type(e).__name__}: {str(e)}")
 
-                # Don't retry JSON parsing errors
+                # Don't retry malformed responses
                 user_message = self._get_user_friendly_error(e)
                 raise ClaudeAPIError(user_message, original_error=e)
 
@@ -245,6 +599,66 @@ Output ONLY valid JSON in this exact format (no markdown, no extra text):
         raise ClaudeAPIError(user_message, original_error=last_error)
 
 
+# Basic fallback questions by topic, validated once at import
+_FALLBACK_BANK: Dict[str, List[QuizQuestion]] = {
+    "linear_equations": [
+        QuizQuestion(
+            question="Solve for x: 2x + 5 = 13",
+            options={"A": "x = 3", "B": "x = 4", "C": "x = 5", "D": "x = 6"},
+            correct="B",
+            explanation="Subtract 5 from both sides: 2x = 8. Then divide by 2: x = 4.",
+            topic="linear_equations"
+        ),
+        QuizQuestion(
+            question="What is the solution to: 3x - 7 = 14?",
+            options={"A": "x = 5", "B": "x = 6", "C": "x = 7", "D": "x = 8"},
+            correct="C",
+            explanation="Add 7 to both sides: 3x = 21. Then divide by 3: x = 7.",
+            topic="linear_equations"
+        ),
+    ],
+    "quadratic_equations": [
+        QuizQuestion(
+            question="What are the solutions to x² - 5x + 6 = 0?",
+            options={"A": "x = 1, 6", "B": "x = 2, 3", "C": "x = -2, -3", "D": "x = 1, 5"},
+            correct="B",
+            explanation="Factor to (x-2)(x-3) = 0. Solutions are x = 2 and x = 3.",
+            topic="quadratic_equations"
+        ),
+    ],
+    "polynomials": [
+        QuizQuestion(
+            question="Simplify: (2x + 3)(x - 4)",
+            options={"A": "2x² - 5x - 12", "B": "2x² - 8x - 12", "C": "2x² + 5x + 12", "D": "2x² + 11x - 12"},
+            correct="A",
+            explanation="Use FOIL: 2x² - 8x + 3x - 12 = 2x² - 5x - 12.",
+            topic="polynomials"
+        ),
+    ],
+    "factoring": [
+        QuizQuestion(
+            question="Factor: x² + 7x + 12",
+            options={"A": "(x + 3)(x + 4)", "B": "(x + 2)(x + 6)", "C": "(x + 1)(x + 12)", "D": "(x - 3)(x - 4)"},
+            correct="A",
+            explanation="Find two numbers that multiply to 12 and add to 7: 3 and 4. So (x + 3)(x + 4).",
+            topic="factoring"
+        ),
+    ],
+}
+
+
+@lru_cache(maxsize=128)
+def _fallback_tuple(topic: str, num_questions: int) -> Tuple[QuizQuestion, ...]:
+    """Build (and memoize) the fallback quiz for a topic and size"""
+    # Get questions for this topic, or use linear equations as default
+    questions = _FALLBACK_BANK.get(topic, _FALLBACK_BANK["linear_equations"])
+    if questions[0].topic != topic:
+        questions = [q.model_copy(update={"topic": topic}) for q in questions]
+
+    # Return requested number of questions (cycle if needed)
+    return tuple(questions[i % len(questions)] for i in range(num_questions))
+
+
 class FallbackQuizGenerator:
     """Fallback quiz generator when Claude API is unavailable"""
 
@@ -262,59 +676,4 @@ class FallbackQuizGenerator:
         """
         logger.info("🔄 Using fallback quiz generator")
 
-        # Basic fallback questions by topic
-        fallback_questions = {
-            "linear_equations": [
-                QuizQuestion(
-                    question="Solve for x: 2x + 5 = 13",
-                    options={"A": "x = 3", "B": "x = 4", "C": "x = 5", "D": "x = 6"},
-                    correct="B",
-                    explanation="Subtract 5 from both sides: 2x = 8. Then divide by 2: x = 4.",
-                    topic=topic
-                ),
-                QuizQuestion(
-                    question="What is the solution to: 3x - 7 = 14?",
-                    options={"A": "x = 5", "B": "x = 6", "C": "x = 7", "D": "x = 8"},
-                    correct="C",
-                    explanation="Add 7 to both sides: 3x = 21. Then divide by 3: x = 7.",
-                    topic=topic
-                ),
-            ],
-            "quadratic_equations": [
-                QuizQuestion(
-                    question="What are the solutions to x² - 5x + 6 = 0?",
-                    options={"A": "x = 1, 6", "B": "x = 2, 3", "C": "x = -2, -3", "D": "x = 1, 5"},
-                    correct="B",
-                    explanation="Factor to (x-2)(x-3) = 0. Solutions are x = 2 and x = 3.",
-                    topic=topic
-                ),
-            ],
-            "polynomials": [
-                QuizQuestion(
-                    question="Simplify: (2x + 3)(x - 4)",
-                    options={"A": "2x² - 5x - 12", "B": "2x² - 8x - 12", "C": "2x² + 5x + 12", "D": "2x² + 11x - 12"},
-                    correct="A",
-                    explanation="Use FOIL: 2x² - 8x + 3x - 12 = 2x² - 5x - 12.",
-                    topic=topic
-                ),
-            ],
-            "factoring": [
-                QuizQuestion(
-                    question="Factor: x² + 7x + 12",
-                    options={"A": "(x + 3)(x + 4)", "B": "(x + 2)(x + 6)", "C": "(x + 1)(x + 12)", "D": "(x - 3)(x - 4)"},
-                    correct="A",
-                    explanation="Find two numbers that multiply to 12 and add to 7: 3 and 4. So (x + 3)(x + 4).",
-                    topic=topic
-                ),
-            ],
-        }
-
-        # Get questions for this topic, or use linear equations as default
-        questions = fallback_questions.get(topic, fallback_questions["linear_equations"])
-
-        # Return requested number of questions (cycle if needed)
-        result = []
-        for i in range(num_questions):
-            result.append(questions[i % len(questions)])
-
-        return result
+        return list(_fallback_tuple(topic, num_questions))
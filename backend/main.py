@@ -1,16 +1,23 @@
 # backend/main.py
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse
+from typing import Dict, List, Optional
+from collections import Counter
+from itertools import chain
+import logging
 import os
 from dotenv import load_dotenv
 from pydantic import BaseModel
 
-from models import Student, QuizResponse, CourseAnalytics, QuizQuestion
+from models import Student, QuizResponse, CourseAnalytics, QuizQuestion, RiskLevel, MATH_TOPICS
 from mock_data import generate_mock_students
 from risk_engine import calculate_risk_score, get_risk_level
 from claude_service import ClaudeService, ClaudeAPIError, FallbackQuizGenerator
 
+# Display names for known topics, e.g. "linear_equations" -> "Linear Equations"
+TOPIC_DISPLAY = {t: t.replace("_", " ").title() for t in MATH_TOPICS}
+
 class QuizRequest(BaseModel):
     student_id: str
     topic: str
@@ -18,7 +25,9 @@ class QuizRequest(BaseModel):
 
 load_dotenv()
 
-app = FastAPI(title="AI Teaching Assistant Demo")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="AI Teaching Assistant Demo", default_response_class=ORJSONResponse)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -31,6 +40,10 @@ app.add_middleware(
 
 # In-memory storage for demo
 students_db: List[Student] = []
+students_by_id: Dict[str, Student] = {}
+
+# Course analytics, recomputed whenever students_db changes
+_analytics_cache: Optional[CourseAnalytics] = None
 
 # Claude service instance (initialized on startup)
 claude_service: Optional[ClaudeService] = None
@@ -39,21 +52,26 @@ use_fallback: bool = False
 @app.on_event("startup")
 async def startup_event():
     """Initialize mock data and Claude service on startup"""
-    global students_db, claude_service, use_fallback
+    global students_db, students_by_id, claude_service, use_fallback
 
     students_db = generate_mock_students(30)
+    students_by_id = {s.id: s for s in students_db}
     print(f"✅ Generated {len(students_db)} mock students")
 
+    recompute_analytics()
+
     # Initialize Claude service
     api_key = os.getenv("ANTHROPIC_API_KEY")
 
     if api_key:
         try:
             # Configure retry settings (3 retries, 1 second initial delay)
+            requests_per_second = os.getenv("CLAUDE_REQUESTS_PER_SECOND")
             claude_service = ClaudeService(
                 api_key=api_key,
                 max_retries=3,
-                initial_retry_delay=1.0
+                initial_retry_delay=1.0,
+                requests_per_second=float(requests_per_second) if requests_per_second else None
             )
             print("✅ Claude service initialized with error handling")
         except ClaudeAPIError as e:
@@ -83,69 +101,68 @@ async def get_students():
 @app.get("/api/students/{student_id}", response_model=Student)
 async def get_student(student_id: str):
     """Get single student details"""
-    student = next((s for s in students_db if s.id == student_id), None)
+    student = students_by_id.get(student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     return student
 
-@app.get("/api/analytics", response_model=CourseAnalytics)
-async def get_analytics():
-    """Get course-wide analytics"""
+def recompute_analytics() -> CourseAnalytics:
+    """Aggregate course-wide analytics from students_db and cache the result"""
+    global _analytics_cache
+
     total = len(students_db)
 
     # Count risk levels
-    high_risk = sum(1 for s in students_db if s.risk_level == "high")
-    medium_risk = sum(1 for s in students_db if s.risk_level == "medium")
-    low_risk = sum(1 for s in students_db if s.risk_level == "low")
+    risk_counts = Counter(s.risk_level for s in students_db)
+    high_risk = risk_counts[RiskLevel.HIGH]
+    medium_risk = risk_counts[RiskLevel.MEDIUM]
+    low_risk = risk_counts[RiskLevel.LOW]
 
     # Calculate top struggle topics
-    topic_counts = {}
-    for student in students_db:
-        for topic in student.struggling_topics:
-            topic_counts[topic] = topic_counts.get(topic, 0) + 1
-
-    top_topics = sorted(
-        [{"topic": topic, "count": count} for topic, count in topic_counts.items()],
-        key=lambda x: x["count"],
-        reverse=True
-    )[:5]
+    topic_counts = Counter(chain.from_iterable(s.struggling_topics for s in students_db))
+    top_topics = [{"topic": topic, "count": count} for topic, count in topic_counts.most_common(5)]
 
     # Average risk score
     avg_risk = sum(s.risk_score for s in students_db) / total if total > 0 else 0
 
-    return CourseAnalytics(
+    _analytics_cache = CourseAnalytics(
         total_students=total,
         at_risk_count=high_risk + medium_risk,
         risk_breakdown={"high": high_risk, "medium": medium_risk, "low": low_risk},
         top_struggle_topics=top_topics,
         avg_risk_score=round(avg_risk, 1)
     )
+    return _analytics_cache
+
+@app.get("/api/analytics", response_model=CourseAnalytics)
+async def get_analytics():
+    """Get course-wide analytics"""
+    if _analytics_cache is None:
+        return recompute_analytics()
+    return _analytics_cache
 
 @app.post("/api/quiz/generate", response_model=QuizResponse)
 async def generate_quiz(request: QuizRequest):
     """Generate practice quiz using Claude API with robust error handling"""
 
-    print(f"\n🎯 Quiz generation requested:")
-    print(f"   Student: {request.student_id}")
-    print(f"   Topic: {request.topic}")
-    print(f"   Questions: {request.num_questions}")
+    logger.info(
+        "🎯 Quiz generation requested: student=%s topic=%s questions=%d",
+        request.student_id, request.topic, request.num_questions
+    )
 
     # Get student context
-    student = next((s for s in students_db if s.id == request.student_id), None)
+    student = students_by_id.get(request.student_id)
     if not student:
-        print(f"❌ Student not found: {request.student_id}")
+        logger.warning("❌ Student not found: %s", request.student_id)
         raise HTTPException(status_code=404, detail="Student not found")
 
-    print(f"✅ Student found: {student.name}")
+    logger.debug("✅ Student found: %s", student.name)
 
     # Format topic for display
-    topic_display = request.topic.replace("_", " ").title()
+    topic_display = TOPIC_DISPLAY.get(request.topic) or request.topic.replace("_", " ").title()
 
     # Prepare student context for Claude
-    student_context = {
-        "grade_average": f"{student.assignments[-1].score:.0f}%" if student.assignments else "N/A",
-        "struggling_topics": ', '.join(student.struggling_topics) if student.struggling_topics else "None"
-    }
+    student_context = student.context_dict
 
     questions = None
     used_fallback = False
@@ -153,23 +170,21 @@ async def generate_quiz(request: QuizRequest):
     # Try to use Claude API if available
     if not use_fallback and claude_service:
         try:
-            print("📞 Attempting to generate quiz with Claude API...")
+            logger.debug("📞 Attempting to generate quiz with Claude API...")
             questions = await claude_service.generate_quiz_questions(
                 topic=request.topic,
                 num_questions=request.num_questions,
                 student_context=student_context
             )
-            print("🎉 Quiz generated successfully with Claude API!")
+            logger.info("🎉 Quiz generated successfully with Claude API")
 
         except ClaudeAPIError as e:
-            print(f"⚠️ Claude API error: {e.message}")
-
-            # Check if we should use fallback
-            if e.original_error:
-                print(f"   Original error: {type(e.original_error).__name__}")
+            logger.warning(
+                "⚠️ Claude API error: %s (original error: %s); falling back to offline quiz generator",
+                e.message, type(e.original_error).__name__ if e.original_error else None
+            )
 
             # Use fallback for certain errors
-            print("🔄 Falling back to offline quiz generator...")
             questions = FallbackQuizGenerator.generate_fallback_questions(
                 topic=request.topic,
                 num_questions=request.num_questions
@@ -177,17 +192,17 @@ async def generate_quiz(request: QuizRequest):
             used_fallback = True
 
             # Return user-friendly error with fallback questions
-            print("✅ Generated fallback quiz")
+            logger.debug("✅ Generated fallback quiz")
 
     # Use fallback if Claude service not available
     if questions is None:
-        print("🔄 Using fallback quiz generator (Claude API not configured)...")
+        logger.info("🔄 Using fallback quiz generator (Claude API not configured)")
         questions = FallbackQuizGenerator.generate_fallback_questions(
             topic=request.topic,
             num_questions=request.num_questions
         )
         used_fallback = True
-        print("✅ Generated fallback quiz")
+        logger.debug("✅ Generated fallback quiz")
 
     # Create response
     quiz_id = f"quiz-{request.student_id}-{request.topic}"
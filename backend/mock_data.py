@@ -1,216 +1,233 @@
 # backend/mock_data.py
-from models import Student, Assignment, RiskLevel
+from models import Student, AssignmentRecord, StudentRecord, MATH_TOPICS
+from pydantic import TypeAdapter
 from datetime import datetime, timedelta
+import math
 import random
-from typing import List
-
-# Math topics for our demo course
-MATH_TOPICS = [
-    "linear_equations",
-    "quadratic_equations",
-    "radicals",
-    "exponents",
-    "polynomials",
-    "factoring",
-    "systems_of_equations",
-    "inequalities"
-]
+from typing import List, Optional
+
+# Validates a whole roster of records into API models in one pass
+_STUDENT_LIST_ADAPTER = TypeAdapter(List[Student])
+
+# Shared generator for all mock data, so a seed reproduces the whole roster
+_RNG = random.Random()
+
+# Fixed score patterns per archetype (one entry per assignment)
+_DECLINING_SCORES = (85, 78, 72, 65, 58)  # Clear decline
+_DECLINING_TOPICS = (
+    ("linear_equations",),
+    ("quadratic_equations",),
+    ("radicals", "exponents"),
+    ("radicals", "polynomials"),
+    ("radicals", "factoring")
+)
+_STRUGGLING_SCORES = (65, 58, 52, 55, 48)
+_STRUGGLING_ATTEMPTS = (3, 4, 5, 4, 5)
+_MODERATE_SCORES = (75, 72, 68, 70, 73)
+_THRIVING_SCORES = (88, 90, 92, 89, 94)
+
+# Assignments are submitted every 12 days from the base date
+_SUBMISSION_OFFSETS = tuple(timedelta(days=i*12) for i in range(5))
+
+def generate_mock_students(count: int = 30, seed: Optional[int] = None) -> List[Student]:
+    """Generate realistic mock student data (reproducible when seed is given)"""
+    if seed is not None:
+        _RNG.seed(seed)
 
-def generate_mock_students(count: int = 30) -> List[Student]:
-    """Generate realistic mock student data"""
     students = []
 
-    # Define student archetypes for realistic scenarios
-    archetypes = {
-        "declining": 6,      # High risk - grades declining
-        "struggling": 6,     # High risk - multiple attempts, low grades
-        "moderate": 12,      # Medium risk - some issues
-        "thriving": 6        # Low risk - doing well
-    }
+    # One clock reading for the whole roster
+    now = datetime.now()
+    base_date = now - timedelta(days=60)
 
-    student_id = 1
+    # Split count across archetypes in proportion to their share; flooring
+    # the running total keeps the parts adding up to exactly count
+    total_share = sum(share for _, share, _, _ in ARCHETYPES)
+    allotted = 0
+    cumulative_share = 0
 
-    # Generate "declining" students
-    for i in range(archetypes["declining"]):
-        name = get_student_name(student_id)
-        assignments = generate_declining_assignments()
-        student = create_student(student_id, name, assignments, days_inactive=random.randint(3, 7))
-        students.append(student)
-        student_id += 1
-
-    # Generate "struggling" students
-    for i in range(archetypes["struggling"]):
-        name = get_student_name(student_id)
-        assignments = generate_struggling_assignments()
-        student = create_student(student_id, name, assignments, days_inactive=random.randint(0, 4))
-        students.append(student)
-        student_id += 1
-
-    # Generate "moderate" students
-    for i in range(archetypes["moderate"]):
-        name = get_student_name(student_id)
-        assignments = generate_moderate_assignments()
-        student = create_student(student_id, name, assignments, days_inactive=random.randint(0, 3))
-        students.append(student)
-        student_id += 1
-
-    # Generate "thriving" students
-    for i in range(archetypes["thriving"]):
-        name = get_student_name(student_id)
-        assignments = generate_thriving_assignments()
-        student = create_student(student_id, name, assignments, days_inactive=random.randint(0, 2))
-        students.append(student)
-        student_id += 1
+    student_id = 1
+    for _, share, generate_assignments, (min_inactive, max_inactive) in ARCHETYPES:
+        cumulative_share += share
+        archetype_count = cumulative_share * count // total_share - allotted
+        allotted += archetype_count
+
+        for _ in range(archetype_count):
+            name = get_student_name(student_id)
+            assignments = generate_assignments(base_date)
+            student = create_student(student_id, name, assignments,
+                                     days_inactive=_RNG.randint(min_inactive, max_inactive), now=now)
+            students.append(student)
+            student_id += 1
+
+    # Score the whole roster at once
+    apply_risk_scores(students, now)
 
     # Shuffle to mix risk levels
-    random.shuffle(students)
-
-    return students
+    _RNG.shuffle(students)
 
-def create_student(student_id: int, name: str, assignments: List[Assignment],
-                   days_inactive: int) -> Student:
-    """Create student with risk calculation"""
-    from risk_engine import calculate_risk_score, get_risk_level, analyze_struggling_topics
+    # Validate into API models only once the records are complete, in one call,
+    # reading record attributes directly (asdict would deep-copy every record)
+    return _STUDENT_LIST_ADAPTER.validate_python(students, from_attributes=True)
 
-    # Create base student
-    student = Student(
+def create_student(student_id: int, name: str, assignments: List[AssignmentRecord],
+                   days_inactive: int, now: Optional[datetime] = None) -> StudentRecord:
+    """Create student record without risk data (see apply_risk_scores)"""
+    return StudentRecord(
         id=f"student-{student_id:03d}",
         name=name,
         email=f"{name.lower().replace(' ', '.')}@university.edu",
-        last_active=datetime.now() - timedelta(days=days_inactive),
-        risk_level=RiskLevel.LOW,  # Will be updated
-        risk_score=0,  # Will be updated
-        risk_reasons=[],
-        assignments=assignments,
-        struggling_topics=[]
+        last_active=(now or datetime.now()) - timedelta(days=days_inactive),
+        assignments=assignments
     )
 
-    # Calculate risk
-    risk_score, reasons = calculate_risk_score(student)
-    risk_level = get_risk_level(risk_score)
-    struggling_topics = analyze_struggling_topics(student)
+def apply_risk_scores(students: List[StudentRecord], now: Optional[datetime] = None) -> None:
+    """Calculate risk for all students in one batch and store it on each student"""
+    from risk_engine import calculate_risk_scores_batch, get_risk_levels, analyze_struggling_topics
 
-    student.risk_score = risk_score
-    student.risk_level = risk_level
-    student.risk_reasons = reasons
-    student.struggling_topics = struggling_topics
+    results = calculate_risk_scores_batch(students, now)
+    levels = get_risk_levels([risk_score for risk_score, _ in results])
 
-    return student
+    for student, (risk_score, reasons), risk_level in zip(students, results, levels):
+        student.risk_score = risk_score
+        student.risk_level = risk_level
+        student.risk_reasons = reasons
+        student.struggling_topics = analyze_struggling_topics(student)
 
-def generate_declining_assignments() -> List[Assignment]:
+def generate_declining_assignments(base_date: datetime) -> List[AssignmentRecord]:
     """Generate assignments with declining grades"""
-    base_date = datetime.now() - timedelta(days=60)
     assignments = []
 
-    scores = [85, 78, 72, 65, 58]  # Clear decline
-    topics_sequence = [
-        ["linear_equations"],
-        ["quadratic_equations"],
-        ["radicals", "exponents"],
-        ["radicals", "polynomials"],
-        ["radicals", "factoring"]
-    ]
-
-    for i, (score, topics) in enumerate(zip(scores, topics_sequence)):
-        assignment = Assignment(
+    scores = _DECLINING_SCORES
+
+    times = _sample_ints(45, 90, len(scores))
+
+    for i, (score, topics) in enumerate(zip(scores, _DECLINING_TOPICS)):
+        assignment = AssignmentRecord(
             id=f"assignment-{i+1}",
             name=f"Assignment {i+1}",
             score=score,
             attempts=min(i + 1, 4),  # Increasing attempts
-            time_spent_minutes=random.randint(45, 90),
-            topics=topics,
-            submitted_at=base_date + timedelta(days=i*12)
+            time_spent_minutes=times[i],
+            topics=list(topics),
+            submitted_at=base_date + _SUBMISSION_OFFSETS[i]
         )
         assignments.append(assignment)
 
     return assignments
 
-def generate_struggling_assignments() -> List[Assignment]:
+def generate_struggling_assignments(base_date: datetime) -> List[AssignmentRecord]:
     """Generate assignments with low scores and many attempts"""
-    base_date = datetime.now() - timedelta(days=60)
     assignments = []
 
-    scores = [65, 58, 52, 55, 48]
-    attempts_list = [3, 4, 5, 4, 5]
+    scores = _STRUGGLING_SCORES
+    attempts_list = _STRUGGLING_ATTEMPTS
+
+    topic_sets = _sample_topic_sets(len(scores))
+    times = _sample_ints(90, 150, len(scores))  # Lots of time
 
     for i, (score, attempts) in enumerate(zip(scores, attempts_list)):
-        topics = random.sample(MATH_TOPICS, k=random.randint(1, 2))
-        assignment = Assignment(
+        assignment = AssignmentRecord(
             id=f"assignment-{i+1}",
             name=f"Assignment {i+1}",
             score=score,
             attempts=attempts,
-            time_spent_minutes=random.randint(90, 150),  # Lots of time
-            topics=topics,
-            submitted_at=base_date + timedelta(days=i*12)
+            time_spent_minutes=times[i],
+            topics=topic_sets[i],
+            submitted_at=base_date + _SUBMISSION_OFFSETS[i]
         )
         assignments.append(assignment)
 
     return assignments
 
-def generate_moderate_assignments() -> List[Assignment]:
+def generate_moderate_assignments(base_date: datetime) -> List[AssignmentRecord]:
     """Generate assignments with moderate performance"""
-    base_date = datetime.now() - timedelta(days=60)
     assignments = []
 
-    scores = [75, 72, 68, 70, 73]
+    scores = _MODERATE_SCORES
+
+    topic_sets = _sample_topic_sets(len(scores))
+    attempts_list = _sample_ints(1, 3, len(scores))
+    times = _sample_ints(50, 80, len(scores))
 
     for i, score in enumerate(scores):
-        topics = random.sample(MATH_TOPICS, k=random.randint(1, 2))
-        assignment = Assignment(
+        assignment = AssignmentRecord(
             id=f"assignment-{i+1}",
             name=f"Assignment {i+1}",
             score=score,
-            attempts=random.randint(1, 3),
-            time_spent_minutes=random.randint(50, 80),
-            topics=topics,
-            submitted_at=base_date + timedelta(days=i*12)
+            attempts=attempts_list[i],
+            time_spent_minutes=times[i],
+            topics=topic_sets[i],
+            submitted_at=base_date + _SUBMISSION_OFFSETS[i]
         )
         assignments.append(assignment)
 
     return assignments
 
-def generate_thriving_assignments() -> List[Assignment]:
+def generate_thriving_assignments(base_date: datetime) -> List[AssignmentRecord]:
     """Generate assignments with strong performance"""
-    base_date = datetime.now() - timedelta(days=60)
     assignments = []
 
-    scores = [88, 90, 92, 89, 94]
+    scores = _THRIVING_SCORES
+
+    topic_sets = _sample_topic_sets(len(scores))
+    times = _sample_ints(30, 60, len(scores))
 
     for i, score in enumerate(scores):
-        topics = random.sample(MATH_TOPICS, k=random.randint(1, 2))
-        assignment = Assignment(
+        assignment = AssignmentRecord(
             id=f"assignment-{i+1}",
             name=f"Assignment {i+1}",
             score=score,
             attempts=1,
-            time_spent_minutes=random.randint(30, 60),
-            topics=topics,
-            submitted_at=base_date + timedelta(days=i*12)
+            time_spent_minutes=times[i],
+            topics=topic_sets[i],
+            submitted_at=base_date + _SUBMISSION_OFFSETS[i]
         )
         assignments.append(assignment)
 
     return assignments
 
+# Student archetypes for realistic scenarios:
+# (name, students per 30, assignment generator, days inactive range)
+ARCHETYPES = (
+    ("declining", 6, generate_declining_assignments, (3, 7)),      # High risk - grades declining
+    ("struggling", 6, generate_struggling_assignments, (0, 4)),    # High risk - multiple attempts, low grades
+    ("moderate", 12, generate_moderate_assignments, (0, 3)),       # Medium risk - some issues
+    ("thriving", 6, generate_thriving_assignments, (0, 2))         # Low risk - doing well
+)
+
+def _sample_ints(low: int, high: int, n: int) -> List[int]:
+    """Draw n random integers in [low, high] with a single call"""
+    return _RNG.choices(range(low, high + 1), k=n)
+
+def _sample_topic_sets(n: int) -> List[List[str]]:
+    """Draw n random sets of 1-2 distinct topics"""
+    sizes = _RNG.choices((1, 2), k=n)
+    return [_RNG.sample(MATH_TOPICS, k) for k in sizes]
+
+_FIRST_NAMES = [
+    "Alice", "Bob", "Carlos", "Diana", "Emma", "Frank",
+    "Grace", "Henry", "Iris", "James", "Kate", "Leo",
+    "Maria", "Noah", "Olivia", "Peter", "Quinn", "Rosa",
+    "Sam", "Tina", "Uma", "Victor", "Wendy", "Xavier",
+    "Yuki", "Zara", "Amir", "Bella", "Chen", "Dev"
+]
+
+_LAST_NAMES = [
+    "Anderson", "Brown", "Chen", "Davis", "Evans", "Foster",
+    "Garcia", "Harris", "Ibrahim", "Johnson", "Kumar", "Lee",
+    "Martinez", "Nguyen", "O'Brien", "Patel", "Quinn", "Rodriguez",
+    "Smith", "Thompson", "Underwood", "Vargas", "Williams", "Xu",
+    "Yang", "Zhang", "Ahmed", "Bennett", "Cohen", "Diaz"
+]
+
+# Full names repeat with this period, so build each one once
+_STUDENT_NAMES = [
+    f"{_FIRST_NAMES[i % len(_FIRST_NAMES)]} {_LAST_NAMES[i % len(_LAST_NAMES)]}"
+    for i in range(math.lcm(len(_FIRST_NAMES), len(_LAST_NAMES)))
+]
+
 def get_student_name(student_id: int) -> str:
     """Generate diverse student names"""
-    first_names = [
-        "Alice", "Bob", "Carlos", "Diana", "Emma", "Frank",
-        "Grace", "Henry", "Iris", "James", "Kate", "Leo",
-        "Maria", "Noah", "Olivia", "Peter", "Quinn", "Rosa",
-        "Sam", "Tina", "Uma", "Victor", "Wendy", "Xavier",
-        "Yuki", "Zara", "Amir", "Bella", "Chen", "Dev"
-    ]
-
-    last_names = [
-        "Anderson", "Brown", "Chen", "Davis", "Evans", "Foster",
-        "Garcia", "Harris", "Ibrahim", "Johnson", "Kumar", "Lee",
-        "Martinez", "Nguyen", "O'Brien", "Patel", "Quinn", "Rodriguez",
-        "Smith", "Thompson", "Underwood", "Vargas", "Williams", "Xu",
-        "Yang", "Zhang", "Ahmed", "Bennett", "Cohen", "Diaz"
-    ]
-
     # Use student_id to get consistent names
-    first = first_names[(student_id - 1) % len(first_names)]
-    last = last_names[(student_id - 1) % len(last_names)]
-    return f"{first} {last}"
+    return _STUDENT_NAMES[(student_id - 1) % len(_STUDENT_NAMES)]
@@ -3,6 +3,20 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
+from dataclasses import dataclass, field
+from functools import cached_property
+
+# Math topics for our demo course
+MATH_TOPICS = [
+    "linear_equations",
+    "quadratic_equations",
+    "radicals",
+    "exponents",
+    "polynomials",
+    "factoring",
+    "systems_of_equations",
+    "inequalities"
+]
 
 class RiskLevel(str, Enum):
     LOW = "low"
@@ -30,6 +44,39 @@ class Student(BaseModel):
     assignments: List[Assignment]
     struggling_topics: List[str]
 
+    @cached_property
+    def context_dict(self) -> dict:
+        """Student context for quiz personalization, built once per student"""
+        return {
+            "grade_average": f"{self.assignments[-1].score:.0f}%" if self.assignments else "N/A",
+            "struggling_topics": ', '.join(self.struggling_topics) if self.struggling_topics else "None"
+        }
+
+# Internal, unvalidated records used while generating and scoring mock data;
+# converted to the pydantic models above at the API boundary
+@dataclass(slots=True)
+class AssignmentRecord:
+    id: str
+    name: str
+    score: float  # 0-100
+    attempts: int
+    time_spent_minutes: int
+    topics: List[str]
+    submitted_at: datetime
+
+@dataclass(slots=True)
+class StudentRecord:
+    id: str
+    name: str
+    email: str
+    last_active: datetime
+    assignments: List[AssignmentRecord]
+    course_id: str = "math-101"
+    risk_level: RiskLevel = RiskLevel.LOW
+    risk_score: int = 0  # 0-100
+    risk_reasons: List[str] = field(default_factory=list)
+    struggling_topics: List[str] = field(default_factory=list)
+
 class QuizQuestion(BaseModel):
     question: str
     options: dict  # {"A": "...", "B": "...", etc}
@@ -1,100 +1,170 @@
 # backend/risk_engine.py
-from models import Student, RiskLevel
-from typing import List
-
-def calculate_risk_score(student: Student) -> tuple[int, List[str]]:
+from models import Student, StudentRecord, RiskLevel, MATH_TOPICS
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# Lower bounds of the medium (21-40) and high (41-100) risk bands
+RISK_THRESHOLDS = (21, 41)
+RISK_LEVELS = (RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH)
+
+# Risk reasons in rule order; bit i of a reason mask stands for REASON_STRS[i]
+REASON_STRS = (
+    "declining_grades",
+    "grade_below_60",
+    "grade_below_70",
+    "multiple_attempts_5plus",
+    "multiple_attempts_3plus",
+    "inactive_7plus_days",
+    "inactive_5plus_days",
+    "excessive_time"
+)
+REASON_BITS = {reason: 1 << i for i, reason in enumerate(REASON_STRS)}
+
+# Decoded reason list for every possible mask
+_REASON_LISTS = tuple(
+    tuple(reason for i, reason in enumerate(REASON_STRS) if mask >> i & 1)
+    for mask in range(1 << len(REASON_STRS))
+)
+
+# Fixed slot per course topic, so per-topic totals live in flat lists
+TOPIC_INDEX = {topic: i for i, topic in enumerate(MATH_TOPICS)}
+
+def calculate_risk_score(student: Union[Student, StudentRecord], now: Optional[datetime] = None) -> tuple[int, List[str]]:
     """
     Calculate risk score (0-100) and identify trigger reasons
     Returns: (risk_score, reasons)
     """
-    score = 0
-    reasons = []
+    return calculate_risk_scores_batch([student], now)[0]
 
-    assignments = student.assignments
-    if not assignments:
-        return 0, []
-
-    # Get recent performance data
-    recent_grades = [a.score for a in assignments[-4:]]  # Last 4 assignments
-    latest_grade = recent_grades[-1] if recent_grades else 100
-    latest_attempts = assignments[-1].attempts if assignments else 1
+def calculate_risk_scores_batch(students: Sequence[StudentRecord],
+                                now: Optional[datetime] = None) -> List[Tuple[int, List[str]]]:
+    """
+    Calculate risk scores for many students in one pass
+    Returns: [(risk_score, reasons), ...] in the same order as students
+    """
+    now = now or datetime.now()
+
+    # Students without assignments have no risk signals yet
+    results: List[Tuple[int, List[str]]] = [(0, []) for _ in students]
+
+    # Gather the features each rule needs once, as parallel lists
+    positions = [i for i, s in enumerate(students) if s.assignments]
+    scored = [students[i] for i in positions]
+    latest = [s.assignments[-1] for s in scored]
+    latest_grades = [a.score for a in latest]
+    latest_attempts = [a.attempts for a in latest]
+    days_inactive = [(now - s.last_active).days for s in scored]
+    latest_time_spent = [a.time_spent_minutes for a in latest]
+
+    # Declining: none of the last 4 grades is higher than the one before
+    # (needs at least 3 assignments), compared in place without slicing;
+    # same rule as is_declining(grades[-4:])
+    declining = [
+        len(a) >= 3
+        and a[-1].score <= a[-2].score <= a[-3].score
+        and (len(a) < 4 or a[-3].score <= a[-4].score)
+        for a in (s.assignments for s in scored)
+    ]
+
+    for i, position in enumerate(positions):
+        results[position] = calculate_risk_score_from_features(
+            latest_grades[i], latest_attempts[i], days_inactive[i], latest_time_spent[i], declining[i]
+        )
+
+    return results
+
+def calculate_risk_score_from_features(latest_grade: float, latest_attempts: int, days_inactive: int,
+                                       latest_time_spent: int, declining: bool) -> tuple[int, List[str]]:
+    """
+    Calculate risk score (0-100) and trigger reasons from precomputed features
+    Returns: (risk_score, reasons)
+    """
+    score = 0
+    reasons = 0  # bitmask over REASON_STRS
 
     # 1. Grade trend analysis (0-20 points)
-    if len(recent_grades) >= 3:
-        if is_declining(recent_grades):
-            score += 20
-            reasons.append("declining_grades")
+    if declining:
+        score += 20
+        reasons |= REASON_BITS["declining_grades"]
 
     # 2. Absolute performance (0-25 points)
     if latest_grade < 60:
         score += 25
-        reasons.append("grade_below_60")
+        reasons |= REASON_BITS["grade_below_60"]
     elif latest_grade < 70:
         score += 15
-        reasons.append("grade_below_70")
+        reasons |= REASON_BITS["grade_below_70"]
 
     # 3. Assignment attempts (0-15 points)
     if latest_attempts >= 5:
         score += 15
-        reasons.append("multiple_attempts_5plus")
+        reasons |= REASON_BITS["multiple_attempts_5plus"]
     elif latest_attempts >= 3:
         score += 10
-        reasons.append("multiple_attempts_3plus")
+        reasons |= REASON_BITS["multiple_attempts_3plus"]
 
     # 4. Engagement - days since last active (0-15 points)
-    from datetime import datetime, timedelta
-    days_inactive = (datetime.now() - student.last_active).days
     if days_inactive > 7:
         score += 15
-        reasons.append("inactive_7plus_days")
+        reasons |= REASON_BITS["inactive_7plus_days"]
     elif days_inactive > 5:
         score += 10
-        reasons.append("inactive_5plus_days")
+        reasons |= REASON_BITS["inactive_5plus_days"]
 
     # 5. Time spent (0-10 points)
     # Assume class average is 60 minutes per assignment
     class_avg_time = 60
-    if assignments[-1].time_spent_minutes > class_avg_time * 2:
+    if latest_time_spent > class_avg_time * 2:
         score += 10
-        reasons.append("excessive_time")
+        reasons |= REASON_BITS["excessive_time"]
 
-    return min(score, 100), reasons
+    return min(score, 100), decode_reasons(reasons)
 
-def is_declining(grades: List[float]) -> bool:
-    """Check if grades show declining trend"""
-    if len(grades) < 3:
-        return False
+def is_declining(grades: Sequence[float]) -> bool:
+    """
+    Check a plain list of grades for a declining trend
+    Needs at least 3 grades, none higher than the one before
+    (the batch scorer applies the same rule in place to the last 4 assignments)
+    """
+    return len(grades) >= 3 and all(later <= earlier for earlier, later in zip(grades, grades[1:]))
 
-    # Simple declining check: each grade lower than previous
-    for i in range(1, len(grades)):
-        if grades[i] > grades[i-1]:
-            return False
-    return True
+def decode_reasons(mask: int) -> List[str]:
+    """Convert a reason bitmask back to reason strings, in rule order"""
+    return list(_REASON_LISTS[mask])
 
 def get_risk_level(risk_score: int) -> RiskLevel:
     """Convert numeric risk score to risk level"""
-    if risk_score >= 41:
-        return RiskLevel.HIGH
-    elif risk_score >= 21:
-        return RiskLevel.MEDIUM
-    else:
-        return RiskLevel.LOW
-
-def analyze_struggling_topics(student: Student) -> List[str]:
+    return RISK_LEVELS[bisect_right(RISK_THRESHOLDS, risk_score)]
+
+def get_risk_levels(risk_scores: Sequence[int]) -> List[RiskLevel]:
+    """Convert many numeric risk scores to risk levels"""
+    levels = RISK_LEVELS
+    thresholds = RISK_THRESHOLDS
+    return [levels[bisect_right(thresholds, score)] for score in risk_scores]
+
+def analyze_struggling_topics(student: StudentRecord) -> List[str]:
     """Identify topics where student struggles"""
-    topic_scores = {}
+    score_sums = [0.0] * len(MATH_TOPICS)
+    score_counts = [0] * len(MATH_TOPICS)
+    # Topics outside the course list, in first-seen order: topic -> [sum, count]
+    other_totals: Dict[str, List[float]] = {}
 
     for assignment in student.assignments:
         for topic in assignment.topics:
-            if topic not in topic_scores:
-                topic_scores[topic] = []
-            topic_scores[topic].append(assignment.score)
-
-    # Topics with average score < 70
-    struggling = []
-    for topic, scores in topic_scores.items():
-        avg_score = sum(scores) / len(scores)
-        if avg_score < 70:
-            struggling.append(topic)
-
+            i = TOPIC_INDEX.get(topic)
+            if i is None:
+                totals = other_totals.setdefault(topic, [0.0, 0])
+                totals[0] += assignment.score
+                totals[1] += 1
+            else:
+                score_sums[i] += assignment.score
+                score_counts[i] += 1
+
+    # Topics with average score < 70, course topics first
+    struggling = [
+        topic for topic, total, count in zip(MATH_TOPICS, score_sums, score_counts)
+        if count and total / count < 70
+    ]
+    struggling.extend(topic for topic, (total, count) in other_totals.items() if total / count < 70)
     return struggling
@@ -5,29 +5,84 @@ Run this to test different error scenarios
 """
 
 import asyncio
+import httpx
 import os
-from unittest.mock import Mock, patch
+import random
+import time
+from functools import lru_cache
+from unittest.mock import AsyncMock, Mock, patch
 from anthropic import APIConnectionError, RateLimitError, APIStatusError
 
-from claude_service import ClaudeService, ClaudeAPIError, FallbackQuizGenerator
+from claude_service import ClaudeService, ClaudeAPIError, FallbackQuizGenerator, QuizCache, TokenBucket
+
+
+# Mock(spec=...) introspects the class, so build each mock error once and share it
+
+@lru_cache(maxsize=None)
+def _mock_error(error_class: type) -> Mock:
+    """Mock API error that passes isinstance checks for error_class"""
+    error = Mock(spec=error_class)
+    error.__class__ = error_class
+    return error
+
+
+@lru_cache(maxsize=None)
+def _status_error(status_code: int) -> Mock:
+    """Mock APIStatusError with the given status code"""
+    error = Mock(spec=APIStatusError)
+    error.__class__ = APIStatusError
+    error.status_code = status_code
+    return error
+
+
+def _rate_limit_error(retry_after: str) -> RateLimitError:
+    """Real RateLimitError whose response carries a Retry-After header"""
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return RateLimitError("Rate limited", response=response, body=None)
+
+
+def _quiz_message(texts) -> Mock:
+    """Mock messages.create response whose submit_quiz call carries one question per text"""
+    tool_use = Mock(type="tool_use", input={"questions": [
+        {
+            "question": text,
+            "options": {"A": "1", "B": "2", "C": "3", "D": "4"},
+            "correct": "A",
+            "explanation": "Test explanation",
+            "topic": "linear_equations"
+        }
+        for text in texts
+    ]})
+    return Mock(content=[tool_use])
+
+
+def _requested_count(request: dict) -> int:
+    """Number of questions asked for in a messages.create call"""
+    # The user prompt starts with "Generate {num_questions} multiple-choice ..."
+    return int(request["messages"][0]["content"].split()[1])
 
 
 async def test_exponential_backoff():
     """Test exponential backoff calculations"""
     print("\n🧪 Testing exponential backoff calculation...")
 
-    service = ClaudeService(api_key="test_key")
+    service = ClaudeService(api_key="test_key", rng=random.Random(42))
 
     delays = []
-    for i in range(5):
+    for i in range(8):
         delay = service._calculate_backoff_delay(i)
         delays.append(delay)
         print(f"   Attempt {i + 1}: {delay:.2f}s")
 
-    # Verify exponential growth
-    assert delays[1] > delays[0], "Backoff should increase"
-    assert delays[2] > delays[1], "Backoff should increase"
-    assert delays[4] <= 60.0, "Backoff should be capped at 60s"
+    # Verify full jitter stays within the exponential ceiling
+    for i, delay in enumerate(delays):
+        assert 0 <= delay <= min(service.initial_retry_delay * (2 ** i), 60.0), "Backoff should stay under ceiling"
+    assert delays[7] <= 60.0, "Backoff should be capped at 60s"
+
+    # Same seed gives the same delays
+    seeded = ClaudeService(api_key="test_key", rng=random.Random(42))
+    assert [seeded._calculate_backoff_delay(i) for i in range(8)] == delays, "Seeded backoff should be deterministic"
 
     print("   ✅ Exponential backoff working correctly")
 
@@ -42,14 +97,10 @@ def test_user_friendly_errors():
     test_cases = []
 
     # Mock RateLimitError
-    rate_limit_error = Mock(spec=RateLimitError)
-    rate_limit_error.__class__ = RateLimitError
-    test_cases.append((rate_limit_error, "request"))
+    test_cases.append((_mock_error(RateLimitError), "request"))
 
     # Mock APIConnectionError
-    connection_error = Mock(spec=APIConnectionError)
-    connection_error.__class__ = APIConnectionError
-    test_cases.append((connection_error, "connection"))
+    test_cases.append((_mock_error(APIConnectionError), "connection"))
 
     # Mock APIStatusError with different status codes
     for status_code, keyword in [
@@ -58,10 +109,7 @@ def test_user_friendly_errors():
         (500, "internal error"),
         (529, "overloaded"),
     ]:
-        status_error = Mock(spec=APIStatusError)
-        status_error.__class__ = APIStatusError
-        status_error.status_code = status_code
-        test_cases.append((status_error, keyword))
+        test_cases.append((_status_error(status_code), keyword))
 
     # Generic exception
     test_cases.append((Exception("Unknown error"), "unexpected"))
@@ -82,8 +130,7 @@ def test_retry_logic():
     service = ClaudeService(api_key="test_key", max_retries=3)
 
     # Mock connection error
-    connection_error = Mock(spec=APIConnectionError)
-    connection_error.__class__ = APIConnectionError
+    connection_error = _mock_error(APIConnectionError)
 
     # Should retry on connection errors
     assert service._should_retry(connection_error, 0)
@@ -91,28 +138,31 @@ def test_retry_logic():
     assert not service._should_retry(connection_error, 3)
 
     # Mock rate limit error
-    rate_limit_error = Mock(spec=RateLimitError)
-    rate_limit_error.__class__ = RateLimitError
+    rate_limit_error = _mock_error(RateLimitError)
 
     # Should retry on rate limits
     assert service._should_retry(rate_limit_error, 0)
 
     # Should retry on specific status codes
     for status_code in [429, 500, 502, 503, 504, 529]:
-        status_error = Mock(spec=APIStatusError)
-        status_error.__class__ = APIStatusError
-        status_error.status_code = status_code
-        assert service._should_retry(status_error, 0), f"Should retry on {status_code}"
+        assert service._should_retry(_status_error(status_code), 0), f"Should retry on {status_code}"
 
     # Should not retry on auth errors
-    auth_error = Mock(spec=APIStatusError)
-    auth_error.__class__ = APIStatusError
-    auth_error.status_code = 401
-    assert not service._should_retry(auth_error, 0)
+    assert not service._should_retry(_status_error(401), 0)
 
     # Should not retry if max attempts reached
     assert not service._should_retry(connection_error, 5)
 
+    # Should honor Retry-After when the server provides it
+    # (fresh mock, since the shared ones must stay unmodified)
+    limited_error = Mock(spec=RateLimitError)
+    limited_error.__class__ = RateLimitError
+    limited_error.response = Mock(headers={"retry-after": "7"})
+    assert service._get_retry_after(limited_error) == 7.0
+    limited_error.response = Mock(headers={})
+    assert service._get_retry_after(limited_error) is None
+    assert service._get_retry_after(connection_error) is None
+
     print("   ✅ Retry logic working correctly")
 
 
@@ -135,6 +185,201 @@ def test_fallback_generator():
     print("   ✅ Fallback working for unknown topics")
 
 
+def test_quiz_cache():
+    """Test quiz response caching"""
+    print("\n🧪 Testing quiz response cache...")
+
+    cache = QuizCache(max_size=2)
+    questions = FallbackQuizGenerator.generate_fallback_questions("linear_equations", 2)
+
+    # Similar students share a bucket regardless of topic order
+    key = QuizCache.make_key(
+        "linear_equations", 2,
+        {"grade_average": "72%", "struggling_topics": "radicals, exponents"},
+        "model"
+    )
+    same_bucket = QuizCache.make_key(
+        "linear_equations", 2,
+        {"grade_average": "68%", "struggling_topics": "exponents, radicals"},
+        "model"
+    )
+    assert key == same_bucket, "Similar students should share a cache key"
+
+    # Grades on a .5 boundary always round up to the next bucket
+    for grade, bucket in [("55%", 60), ("64%", 60), ("65%", 70), ("75%", 80), ("85%", 90)]:
+        grade_key = QuizCache.make_key("linear_equations", 2, {"grade_average": grade}, "model")
+        assert grade_key[2] == bucket, f"{grade} should fall in the {bucket}% bucket"
+
+    assert cache.get(key) is None, "Empty cache should miss"
+    cache.put(key, questions)
+    cached = cache.get(key)
+    assert [q.question for q in cached] == [q.question for q in questions]
+    assert cached[0] is not questions[0], "Cache should return copies"
+    print("   ✅ Cache hit returns copied questions")
+
+    # Least recently used entry is evicted once full
+    cache.put(("a",), questions)
+    cache.put(("b",), questions)
+    assert len(cache) == 2
+    assert cache.get(key) is None, "Oldest entry should be evicted"
+
+    cache.clear()
+    assert len(cache) == 0
+    print("   ✅ LRU eviction and clear working correctly")
+
+
+async def test_token_bucket():
+    """Test local rate limiting"""
+    print("\n🧪 Testing token bucket rate limiter...")
+
+    bucket = TokenBucket(rate=20.0, capacity=1)
+
+    # The first token is available immediately, the next one after 1/rate seconds
+    start = time.monotonic()
+    await bucket.acquire()
+    await bucket.acquire()
+    elapsed = time.monotonic() - start
+    assert elapsed >= 0.04, "Second request should wait for a refill"
+    print(f"   ✅ Requests spaced by {elapsed:.2f}s")
+
+    # Draining holds requests until the deadline
+    bucket.drain_until(time.monotonic() + 0.1)
+    start = time.monotonic()
+    await bucket.acquire()
+    elapsed = time.monotonic() - start
+    assert elapsed >= 0.1, "Drained bucket should wait for the deadline"
+    print(f"   ✅ Drained bucket waited {elapsed:.2f}s")
+
+    # Waits longer than max_wait fail fast instead of sleeping
+    bucket = TokenBucket(rate=0.01, capacity=1, max_wait=0.1)
+    await bucket.acquire()
+    start = time.monotonic()
+    try:
+        await bucket.acquire()
+        assert False, "Acquire should raise when the wait exceeds max_wait"
+    except ClaudeAPIError as e:
+        assert e.retry_after == 100, "Error should report the remaining wait"
+    assert time.monotonic() - start < 0.1, "Acquire should not sleep before raising"
+    print("   ✅ Long wait raises ClaudeAPIError")
+
+    # A huge drain is clamped to max_wait: requests fail fast meanwhile, then resume
+    bucket = TokenBucket(rate=20.0, capacity=1, max_wait=0.1)
+    bucket.drain_until(time.monotonic() + 3600)
+    try:
+        await bucket.acquire()
+        assert False, "Acquire should raise while the bucket is drained"
+    except ClaudeAPIError:
+        pass
+    await asyncio.sleep(0.2)
+    start = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - start < 0.1, "Drain should end after max_wait"
+    print("   ✅ Long drain clamped to max_wait")
+
+
+async def test_retry_after_handling():
+    """Test that requests honor Retry-After through a real retry"""
+    print("\n🧪 Testing Retry-After handling...")
+
+    context = {"grade_average": "72%", "struggling_topics": "radicals"}
+
+    # A short Retry-After is waited out before the next attempt
+    service = ClaudeService(api_key="test_key", max_retries=2)
+    service.client = Mock()
+    service.client.messages.create = AsyncMock(side_effect=[
+        _rate_limit_error("0.1"),
+        _quiz_message(["Question 1"]),
+    ])
+    start = time.monotonic()
+    questions = await service._request_questions("linear_equations", 1, context, "model")
+    elapsed = time.monotonic() - start
+    assert [q.question for q in questions] == ["Question 1"]
+    assert service.client.messages.create.await_count == 2, "Request should be retried once"
+    assert elapsed >= 0.1, "Retry should wait for Retry-After"
+    print(f"   ✅ Retried after {elapsed:.2f}s")
+
+    # A Retry-After beyond the cap gives up at once, so the caller can fall back
+    service = ClaudeService(api_key="test_key", max_retries=2)
+    service.client = Mock()
+    service.client.messages.create = AsyncMock(side_effect=[_rate_limit_error("3600")])
+    start = time.monotonic()
+    try:
+        await service._request_questions("linear_equations", 1, context, "model")
+        assert False, "Long Retry-After should raise ClaudeAPIError"
+    except ClaudeAPIError as e:
+        assert e.retry_after == 3600, "Error should carry the server's Retry-After"
+    assert service.client.messages.create.await_count == 1, "Long Retry-After should not be retried"
+    assert time.monotonic() - start < 1.0, "Long Retry-After should not be slept"
+    print("   ✅ Long Retry-After raises without waiting")
+
+
+async def test_quiz_sharding():
+    """Test parallel quiz generation and merging with a stubbed client"""
+    print("\n🧪 Testing sharded quiz generation...")
+
+    context = {"grade_average": "72%", "struggling_topics": "radicals"}
+
+    # Unique questions: 8 questions are split across 4 calls and cached
+    service = ClaudeService(api_key="test_key", max_parallel_requests=4)
+    counter = iter(range(1000))
+
+    async def unique_questions(**request):
+        return _quiz_message([f"Question {next(counter)}" for _ in range(_requested_count(request))])
+
+    service.client = Mock()
+    service.client.messages.create = AsyncMock(side_effect=unique_questions)
+    questions = await service.generate_quiz_questions("linear_equations", 8, context)
+    assert len(questions) == 8, "Merged quiz should have every requested question"
+    assert service.client.messages.create.await_count == 4, "Quiz should be split into 4 requests"
+    assert len(service.cache) == 1, "Full quiz should be cached"
+    print("   ✅ Shards merged into a full quiz")
+
+    # The usual 5-question quiz becomes 2 shards of 3 and 2, each with its own part
+    service = ClaudeService(api_key="test_key", max_parallel_requests=4)
+    service.client = Mock()
+    service.client.messages.create = AsyncMock(side_effect=unique_questions)
+    questions = await service.generate_quiz_questions("linear_equations", 5, context)
+    requests = [call.kwargs for call in service.client.messages.create.await_args_list]
+    assert len(questions) == 5
+    assert [_requested_count(r) for r in requests] == [3, 2], "Every shard should get at least 2 questions"
+    prompts = [r["messages"][0]["content"] for r in requests]
+    assert "part 1 of 2" in prompts[0] and "part 2 of 2" in prompts[1], "Shards should get distinct focuses"
+    print("   ✅ 5-question quiz split into 2 focused shards")
+
+    # Repeated questions: duplicates are dropped, and the short quiz is not cached
+    service = ClaudeService(api_key="test_key", max_parallel_requests=4)
+
+    async def repeated_question(**request):
+        return _quiz_message(["Same question"] * _requested_count(request))
+
+    service.client = Mock()
+    service.client.messages.create = AsyncMock(side_effect=repeated_question)
+    questions = await service.generate_quiz_questions("linear_equations", 8, context)
+    assert [q.question for q in questions] == ["Same question"], "Duplicates should be dropped"
+    assert service.client.messages.create.await_count == 5, "Missing questions should be requested once more"
+    follow_up = service.client.messages.create.await_args_list[-1].kwargs["messages"][0]["content"]
+    assert "- Same question" in follow_up, "Follow-up should list questions to avoid"
+    assert len(service.cache) == 0, "Short quiz should not be cached"
+    print("   ✅ Duplicates dropped and short quiz not cached")
+
+    # One failing shard fails the whole quiz
+    service = ClaudeService(api_key="test_key", max_parallel_requests=4)
+    service.client = Mock()
+    service.client.messages.create = AsyncMock(side_effect=[
+        _quiz_message(["Question A", "Question B"]),
+        RuntimeError("shard failed"),
+        _quiz_message(["Question C", "Question D"]),
+        _quiz_message(["Question E", "Question F"]),
+    ])
+    try:
+        await service.generate_quiz_questions("linear_equations", 8, context)
+        assert False, "A failing shard should raise ClaudeAPIError"
+    except ClaudeAPIError:
+        pass
+    assert len(service.cache) == 0, "Failed quiz should not be cached"
+    print("   ✅ Failing shard raises ClaudeAPIError")
+
+
 async def test_integration_scenarios():
     """Test real-world integration scenarios"""
     print("\n🧪 Testing integration scenarios...")
@@ -171,11 +416,22 @@ async def run_all_tests():
     print("=" * 60)
 
     try:
-        await test_exponential_backoff()
-        test_user_friendly_errors()
-        test_retry_logic()
-        test_fallback_generator()
-        await test_integration_scenarios()
+        # Tests are independent: run sync ones in worker threads alongside the async ones
+        loop = asyncio.get_running_loop()
+        sync_tests = [
+            test_user_friendly_errors,
+            test_retry_logic,
+            test_fallback_generator,
+            test_quiz_cache,
+        ]
+        await asyncio.gather(
+            test_exponential_backoff(),
+            test_token_bucket(),
+            test_retry_after_handling(),
+            test_quiz_sharding(),
+            test_integration_scenarios(),
+            *[loop.run_in_executor(None, test) for test in sync_tests]
+        )
 
         print("\n" + "=" * 60)
         print("✅ ALL TESTS PASSED!")
@@ -184,7 +440,11 @@ async def run_all_tests():
         print("  ✓ Exponential backoff with jitter")
         print("  ✓ User-friendly error messages")
         print("  ✓ Smart retry logic")
+        print("  ✓ Retry-After handling")
         print("  ✓ Fallback quiz generator")
+        print("  ✓ Quiz response caching")
+        print("  ✓ Parallel quiz generation")
+        print("  ✓ Local rate limiting")
         print("  ✓ Proper error propagation")
 
     except AssertionError as e:
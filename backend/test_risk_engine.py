@@ -0,0 +1,136 @@
+# backend/test_risk_engine.py
+"""
+Test script to verify the risk engine
+Run this to check struggling-topic analysis and risk scoring
+"""
+
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from itertools import product
+
+from models import AssignmentRecord, Student, StudentRecord
+from risk_engine import analyze_struggling_topics, calculate_risk_score, is_declining
+
+
+def _student(graded_topics, last_active=None) -> StudentRecord:
+    """Student record with one assignment per (score, topics) pair"""
+    now = datetime.now()
+    assignments = [
+        AssignmentRecord(
+            id=f"assignment-{i + 1}",
+            name=f"Assignment {i + 1}",
+            score=score,
+            attempts=1,
+            time_spent_minutes=45,
+            topics=list(topics),
+            submitted_at=now - timedelta(days=12 * (len(graded_topics) - i))
+        )
+        for i, (score, topics) in enumerate(graded_topics)
+    ]
+    return StudentRecord(
+        id="student-001",
+        name="Alice Anderson",
+        email="alice.anderson@university.edu",
+        last_active=last_active or now,
+        assignments=assignments
+    )
+
+
+def test_struggling_topics():
+    """Test struggling topic detection"""
+    print("\n🧪 Testing struggling topic analysis...")
+
+    student = _student([
+        (85, ["linear_equations"]),
+        (60, ["radicals", "exponents"]),
+        (75, ["radicals"]),
+        (65, ["factoring", "statistics"]),
+        (74, ["statistics", "exponents"]),
+    ])
+
+    # radicals averages 67.5, exponents 67 and factoring 65, in course order;
+    # statistics is outside the course list, averages 69.5 and comes last
+    topics = analyze_struggling_topics(student)
+    assert topics == ["radicals", "exponents", "factoring", "statistics"], topics
+    print(f"   ✅ Struggling topics: {topics}")
+
+    # A topic averaging exactly 70 is not struggling
+    student = _student([(70, ["polynomials"]), (60, ["geometry"]), (80, ["geometry"])])
+    assert analyze_struggling_topics(student) == [], "Average of 70 should not count as struggling"
+    print("   ✅ Boundary average of 70 is not struggling")
+
+    # No assignments, no struggling topics
+    assert analyze_struggling_topics(_student([])) == []
+    print("   ✅ Student without assignments has no struggling topics")
+
+
+def test_declining_grades():
+    """Test the declining grade trend rule"""
+    print("\n🧪 Testing declining grade detection...")
+
+    assert is_declining([85, 78, 72, 65])
+    assert is_declining([80, 80, 75]), "Flat steps still count as declining"
+    assert not is_declining([85, 78, 80, 65]), "Any rise breaks the decline"
+    assert not is_declining([85, 78]), "Needs at least 3 grades"
+    print("   ✅ is_declining working correctly")
+
+    # Only the last 4 assignments count: an early rise doesn't matter
+    student = _student([(50, ["radicals"]), (90, ["radicals"]), (85, ["radicals"]),
+                        (80, ["radicals"]), (75, ["radicals"])])
+    _, reasons = calculate_risk_score(student)
+    assert "declining_grades" in reasons, reasons
+    print("   ✅ Risk score flags declining grades over the last 4 assignments")
+
+    # The batch scorer's in-place check agrees with is_declining on the last 4 grades
+    for n in range(6):
+        for grades in product((60, 70, 80), repeat=n):
+            student = _student([(grade, ["radicals"]) for grade in grades])
+            _, reasons = calculate_risk_score(student)
+            expected = is_declining(list(grades[-4:]))
+            assert ("declining_grades" in reasons) == expected, grades
+    print("   ✅ Batch decline check matches is_declining")
+
+
+def test_inactivity():
+    """Test days-inactive scoring for records and API models"""
+    print("\n🧪 Testing inactivity scoring...")
+
+    now = datetime.now()
+    record = _student([(85, ["linear_equations"])], last_active=now - timedelta(days=8))
+    _, reasons = calculate_risk_score(record, now)
+    assert reasons == ["inactive_7plus_days"], reasons
+
+    # Exactly 7 days is not more than 7
+    record.last_active = now - timedelta(days=7)
+    _, reasons = calculate_risk_score(record, now)
+    assert reasons == ["inactive_5plus_days"], "Reassigning last_active should be picked up"
+    print("   ✅ Student records scored by days inactive")
+
+    # The single-student API also scores validated Student models
+    student = Student(**asdict(record))
+    assert calculate_risk_score(student, now) == (10, ["inactive_5plus_days"])
+    print("   ✅ Student models scored the same way")
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 60)
+    print("🚀 Running Risk Engine Tests")
+    print("=" * 60)
+
+    try:
+        test_struggling_topics()
+        test_declining_grades()
+        test_inactivity()
+
+        print("\n" + "=" * 60)
+        print("✅ ALL TESTS PASSED!")
+        print("=" * 60)
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    run_all_tests()